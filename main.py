@@ -17,12 +17,17 @@ a config file, ensure that the csv files you want to use are within the director
 file paths given in the config file are valid. To run this script enter "python3 main.py" or "py main.py" depending on 
 your environment.
 """
+import concurrent.futures
 import configparser
 import csv
+import functools
+import itertools
+import operator
 import os
 import re
+import stat
 import sys
-from typing import Iterable
+from typing import Callable, Iterable, Iterator, Mapping, Sequence
 
 # Custom type aliases for clarity
 Header = str
@@ -31,6 +36,11 @@ Row = dict[Header, Data]
 
 CONFIG_FILE_NAME: str = "config_template.ini"
 DEBUG: bool = False  # either change this here or use --debug from command line
+# Buffer size for reading and writing csv files. 1 MiB instead of the default 8 KiB means ~128x fewer read/write
+# syscalls on large files. Each open csv file holds one buffer, so only a few MiB are ever used (more with --parallel).
+BUFFER_SIZE: int = 1 << 20
+# Dialect names accepted in the config file (keys) and the names the csv module registers them under (values)
+DIALECTS: dict[str, str] = {"excel": "excel", "excel_tab": "excel-tab", "excel-tab": "excel-tab", "unix": "unix"}
 HELP_MSG = """USAGE
 
 python3 main.py [OPTION]
@@ -45,6 +55,9 @@ OPTIONS
 \t\tEnables debug print statements
 \t-h, --help
 \t\tPrints this help message and terminates
+\t--parallel
+\t\tParses all source csv files at the same time in worker threads instead 
+\t\tof one after another (uses more memory)
 \t--strict
 \t\tIf data after the first source does not match in at least one of the 
 \t\tmatch_by fields, then the data is considered unmatched as opposed to 
@@ -82,10 +95,12 @@ def main(args: list[str] = None):
         DEBUG = True
 
     strict: bool = "--strict" in args
+    parallel: bool = "--parallel" in args
 
     config: configparser.ConfigParser = get_config_constants()
 
     merged_data: list[Row] = []
+    match_index: dict[Header, dict[Data, list[Row]]] = {}  # kept up to date across sources, not rebuilt per source
     cols_name_mapping: dict = map_columns_names(config)
     headers: list[str] = unify_headers(cols_name_mapping)
 
@@ -93,32 +108,37 @@ def main(args: list[str] = None):
 
     print("="*80)
 
+    parsed_sources: Iterator[Iterable[Row]] = parse_sources(config, cols_name_mapping, parallel=parallel)
+
+    # Plain values/dicts instead of configparser lookups (which interpolate on every access) for use in the row loops
+    output_settings: dict[str, str] = dict(config["output"])
+    # Rule regex is compiled once here rather than wherever it is applied
+    field_rules: dict[Header, re.Pattern] = None
+    if "field_rules" in config:
+        field_rules = compile_rules(config["field_rules"])
+    source_rules: dict[str, dict[Header, re.Pattern]] = parse_source_rules(config)
+
     # NOTE: The order of headers in each row dict doesn't matter,
-    #       only the order in which they are passed to the DictWriter (fieldnames param) matters
+    #       only the order of the headers passed to write_csv matters
     for source in config["sources"]:
-        print(f"Parsing {source}...", end="", flush=True)
-        parsed_source: list[Row] = parse_csv(config["sources"][source], config.getint(source, "header_row_num"),
-                                             parse_ignored_rows(config[source]["ignored_rows"]))
-        print("DONE", flush=True)
-
-        print(f"Transferring {source}'s data...", end="", flush=True)
-        field_rules = None if "field_rules" not in config else config["field_rules"]
+        # Unless parsing in parallel, the source is parsed as it is transferred
+        print(f"Parsing and transferring {source}'s data...", end="", flush=True)
+        parsed_source: Iterable[Row] = next(parsed_sources)
         transfer_data(source, parsed_source, merged_data, cols_name_mapping[source],
-                      config[source]["match_by"].split(","), unmatched_output=config["output"]["unmatched_file_name"],
-                      dialect=config["output"]["dialect"], regex=field_rules, strict=strict)
+                      config[source]["match_by"].split(","), unmatched_output=output_settings["unmatched_file_name"],
+                      dialect=output_settings["dialect"], regex=field_rules, strict=strict, match_index=match_index)
         print("DONE", flush=True)
 
     print("Enforcing source rule(s)...", end="", flush=True)
-    source_rules = parse_source_rules(config)
     enforce_source_rules(merged_data, source_rules)
     print("DONE", flush=True)
 
     print("Writing results to output file...", end="", flush=True)
-    write_csv(config["output"]["file_name"], headers, merged_data, config["output"]["dialect"])
-    print(f"DONE\n\nResults can be found in {config['output']['file_name']}")
+    write_csv(output_settings["file_name"], headers, merged_data, output_settings["dialect"])
+    print(f"DONE\n\nResults can be found in {output_settings['file_name']}")
 
-    if config["output"]["unmatched_file_name"] not in [None, ""]:
-        print(f"Unmatched data can be found in {config['output']['unmatched_file_name']}")
+    if output_settings["unmatched_file_name"]:
+        print(f"Unmatched data can be found in {output_settings['unmatched_file_name']}")
 
     print("="*80)
 
@@ -134,12 +154,16 @@ def valid_file_names(file_names: Iterable[str]) -> bool:
 
     for file in file_names:
         # If files (or relative paths) aren't in the current directory then they are not valid
-        path: str = os.path.join(os.getcwd(), file)
-        path_exists: bool = os.path.exists(path)
-        is_file: bool = os.path.isfile(path)
+        try:
+            # One stat call answers both questions (exists and isfile would each stat the path). Relative paths are
+            # already resolved against the current directory, so the path isn't joined with it first.
+            path_exists: bool = True
+            is_file: bool = stat.S_ISREG(os.stat(file).st_mode)
+        except (OSError, ValueError):  # same failures os.path.exists treats as the path not existing
+            path_exists = is_file = False
         if not path_exists or not is_file:
             print(f"\nInvalid file name: '{file}'", file=sys.stderr)
-            print("" if path_exists else f"{path} does not exist\n", file=sys.stderr, end="")
+            print("" if path_exists else f"{os.path.abspath(file)} does not exist\n", file=sys.stderr, end="")
             print("" if is_file else f"{file} is not a file", file=sys.stderr)
             return False
 
@@ -168,11 +192,11 @@ def validate_config(config: configparser.ConfigParser) -> None:
         err_msg += "Invalid source file name(s). Ensure the paths are correct in the config file\n"
 
     # Identify missing source sections
-    missing_sources = []
+    missing_sources: set[str] = set()
     for source in config["sources"]:
         if source not in config:
             err_msg += f"Source section \"{source}\" not found\n"
-            missing_sources.append(source)
+            missing_sources.add(source)
         elif base_sections_exist:
             for key in config["defaults"]:
                 if key not in config[source]:
@@ -203,6 +227,10 @@ def validate_config(config: configparser.ConfigParser) -> None:
                 if no_value_in_source and (not_in_defaults or no_value_in_defaults):
                     err_msg += f"No value for {key} in {source} or in defaults\n"
 
+            # The dialect of a source is optional (it is guessed when left out or empty)
+            if config[source].get("dialect") not in [None, "", *DIALECTS]:
+                err_msg += f'Invalid dialect \"{config[source]["dialect"]}\" in {source}\n'
+
             # Check for empty source rules
             source_rules = f"{source}_rules"
             if source_rules in config:
@@ -219,7 +247,7 @@ def validate_config(config: configparser.ConfigParser) -> None:
             elif config["output"][key] in [None, ""]:
                 err_msg += f"No value for output {key}\n"
 
-        if "dialect" in config["output"] and config["output"]["dialect"] not in ["excel", "excel_tab", "unix"]:
+        if "dialect" in config["output"] and config["output"]["dialect"] not in DIALECTS:
             err_msg += f'Invalid output dialect \"{config["output"]["dialect"]}\"\n'
 
     # Check for empty field rules
@@ -251,6 +279,8 @@ def validate_rules(config: configparser.ConfigParser, output_headers: list[Heade
         for rule in config["field_rules"]:
             if rule not in output_headers:
                 err_msg += f"field_rule error: Could not find the header \"{rule}\" in output headers\n"
+            if not valid_regex(config["field_rules"][rule]):
+                err_msg += f"field_rule error: Invalid regex for the header \"{rule}\"\n"
 
     for source in config["sources"]:
         rules_section = f"{source}_rules"
@@ -259,11 +289,28 @@ def validate_rules(config: configparser.ConfigParser, output_headers: list[Heade
             for rule in config[rules_section]:
                 if rule not in output_headers:
                     err_msg += f"{rules_section} error: Could not find the header \"{rule}\" in output headers\n"
+                if not valid_regex(config[rules_section][rule]):
+                    err_msg += f"{rules_section} error: Invalid regex for the header \"{rule}\"\n"
 
     if err_msg != "":
         raise SystemExit(err_msg.rstrip())
 
 
+def valid_regex(pattern: str) -> bool:
+    """
+    Determines if a rule's regex can be compiled.
+
+    :param pattern: Regex from a rule in the config file
+    :return: True if the regex compiles, false otherwise
+    """
+    try:
+        re.compile(pattern)
+    except (re.error, TypeError):  # TypeError for a rule left without a value
+        return False
+
+    return True
+
+
 def get_config_constants() -> configparser.ConfigParser:
     """
     Assigns config constants from the file CONFIG_FILE_NAME. Both the constants and the config file are described in the
@@ -279,21 +326,50 @@ def get_config_constants() -> configparser.ConfigParser:
                          f"Either create a config file by that name or change the CONFIG_FILE_NAME variable in this "
                          f"script.")
 
+    config_stat = os.stat(CONFIG_FILE_NAME)
     config = configparser.ConfigParser(allow_no_value=True)
     config.optionxform = str
-    config.read(CONFIG_FILE_NAME)
+    config.read_dict(read_config_file(CONFIG_FILE_NAME, config_stat.st_mtime_ns, config_stat.st_size),
+                     source=CONFIG_FILE_NAME)
     validate_config(config)
 
     # Set all values of keys in sources appear in defaults to defaults if not set
     # (configparser does this but for all sections, and I don't want that)
+    # (defaults are read once, without a section lookup and interpolation per key per source)
+    defaults: list[tuple[str, str]] = [(key, value) for key, value in config["defaults"].items()
+                                       if value not in [None, ""]]
     for source in config["sources"]:
-        for key in config["defaults"]:
-            if config[source][key] in [None, ""] and config["defaults"][key] not in [None, ""]:
-                config[source][key] = config["defaults"][key]
+        section: configparser.SectionProxy = config[source]
+        for key, value in defaults:
+            if section[key] in [None, ""]:
+                section[key] = value
 
     return config
 
 
+@functools.lru_cache(maxsize=16)
+def read_config_file(file_name: str, mtime_ns: int, size: int) -> dict[str, dict[str, str]]:
+    """
+    Reads and parses a config file. Results are cached by file name, modification time, and size so repeated loads of
+    an unchanged config file (e.g. scripted or repeated runs in the same process) skip both the file read and the ini
+    parse, while any edit to the file changes the key and causes a fresh parse. Values are kept raw (uninterpolated) so
+    the caller can rebuild an equivalent ConfigParser with read_dict. The returned dictionary is shared between calls
+    and must not be modified.
+
+    :param file_name: Name of the config file
+    :param mtime_ns: Modification time of the config file in nanoseconds (part of the cache key)
+    :param size: Size of the config file in bytes (part of the cache key)
+    :return: Dictionary where the keys are the sections of the config file and the values are dictionaries of that
+    section's raw variables
+    """
+    parser = configparser.ConfigParser(allow_no_value=True)
+    parser.optionxform = str
+    with open(file_name) as f:
+        parser.read_file(f)
+
+    return {section: dict(parser.items(section, raw=True)) for section in parser.sections()}
+
+
 def map_columns_names(config: configparser.ConfigParser) -> dict[str, dict[Header, Header]]:
     """
     Parses the comma separated lists of target_columns, match_by, column_names, and match_by_names from the config
@@ -309,89 +385,196 @@ def map_columns_names(config: configparser.ConfigParser) -> dict[str, dict[Heade
     cols_names_mapping: dict[str, dict[Header, Header]] = {}
 
     for source in config["sources"]:
-        target_cols: list[str] = config[source]["target_columns"].split(",")
-        col_names: list[str] = config[source]["column_names"].split(",")
+        section: configparser.SectionProxy = config[source]
 
-        match_by: list[str] = config[source]["match_by"].split(",")
-        match_by_names: list[str] = config[source]["match_by_names"].split(",")
+        # Empty strings are left out (happens when config file field is left fully or partially empty). Headers and
+        # names are interned since they are used as the keys of every row.
+        target_cols: list[str] = [sys.intern(header) for header in section["target_columns"].split(",") if header]
+        col_names: list[str] = [sys.intern(name) for name in section["column_names"].split(",") if name]
 
-        # Remove empty strings (happens when config file field is left fully or partially empty)
-        for header_list in [target_cols, col_names, match_by, match_by_names]:
-            for _ in range(header_list.count("")):
-                header_list.remove("")
+        match_by: list[str] = [sys.intern(header) for header in section["match_by"].split(",") if header]
+        match_by_names: list[str] = [sys.intern(name) for name in section["match_by_names"].split(",") if name]
 
-        cols_names_mapping[source] = {}
-        for i, col in enumerate(match_by):
-            if i < len(match_by_names):
-                cols_names_mapping[source][col] = match_by_names[i]
-            else:
-                cols_names_mapping[source][col] = col
-
-        for i, col in enumerate(target_cols):
-            if i < len(col_names):
-                cols_names_mapping[source][col] = col_names[i]
-            else:
-                cols_names_mapping[source][col] = col
+        # Pair each header with its name, headers past the end of the names are paired with themselves
+        cols_names_mapping[source] = dict(zip(match_by, match_by_names + match_by[len(match_by_names):]))
+        cols_names_mapping[source].update(zip(target_cols, col_names + target_cols[len(col_names):]))
 
     return cols_names_mapping
 
 
-def parse_ignored_rows(ignored_rows_str: str) -> list[int]:
+def parse_ignored_rows(ignored_rows_str: str) -> frozenset[int]:
     """
-    Converts string of comma separated list of row numbers to a list of integers.
+    Converts string of comma separated list of row numbers to a set of integers. A set since every parsed row is
+    checked against it. Empty entries (e.g. from a trailing comma or an empty value) are skipped.
 
     :param ignored_rows_str: Comma separated list of row numbers
-    :return: List of row numbers
+    :return: Set of row numbers
     """
-    ignored_rows: list[int] = []
-    for row_num in ignored_rows_str.split(","):
-        ignored_rows.append(int(row_num))
-
-    return ignored_rows
+    return frozenset(int(row_num) for row_num in ignored_rows_str.split(",") if row_num.strip())
 
 
-def parse_csv(file_name: str, header_line_num: int, ignored_rows: list[int]):
+def parse_csv(file_name: str, header_line_num: int, ignored_rows: Iterable[int],
+              columns: Iterable[Header] = None, dialect: str = None) -> list[Row]:
     """
     Parses a csv file into a list of its rows. Each row is put into a dictionary where the keys are the headers for a
     column and the values are the elements of that row. Rows listed in ignored_rows are not parsed. The header row is
-    not an element of the list, but is represented in every element of the list by the key values.
+    not an element of the list, but is represented in every element of the list by the key values. If columns is given
+    then only those columns are put into each row, which keeps rows from wide csv files small when only a few columns
+    are needed. If dialect is not given then it is guessed from the first line of the file.
 
     :param file_name: name of file to parse
     :param header_line_num: line number of the headers (starts at 0)
     :param ignored_rows: List of row numbers to ignore
+    :param columns: Headers of the columns to keep (all columns are kept if not given)
+    :param dialect: Name of the csv dialect the file is in (guessed if not given)
+    :raises SystemExit: If the file, the header row, or any of the given columns can't be found
     :return: List of the rows of the csv
     """
-    try:
-        with open(file_name, newline='', errors="ignore") as csvfile:
-            dialect = csv.Sniffer().sniff(csvfile.readline())
-            csvfile.seek(0)
+    return list(iter_csv(file_name, header_line_num, ignored_rows, columns=columns, dialect=dialect))
+
+
+def iter_csv(file_name: str, header_line_num: int, ignored_rows: Iterable[int],
+             columns: Iterable[Header] = None, dialect: str = None) -> Iterator[Row]:
+    """
+    Parses a csv file one row at a time, yielding the same rows parse_csv would return in the same order. Only the row
+    being yielded is held in memory, so a source can be transferred while it is read instead of being loaded in full
+    first. The file stays open until the generator is exhausted or closed.
 
-            header_reader = csv.reader(csvfile, dialect=dialect)
-            for _ in range(header_line_num):
-                header_reader.__next__()
+    :param file_name: name of file to parse
+    :param header_line_num: line number of the headers (starts at 0)
+    :param ignored_rows: List of row numbers to ignore
+    :param columns: Headers of the columns to keep (all columns are kept if not given)
+    :param dialect: Name of the csv dialect the file is in (guessed if not given)
+    :raises SystemExit: If the file, the header row, or any of the given columns can't be found
+    :return: Generator of the rows of the csv
+    """
+    ignored_rows = frozenset(ignored_rows)  # checked for every row
 
-            headers: list[str] = header_reader.__next__()
-            csvfile.seek(0)
+    try:
+        with open(file_name, newline='', errors="ignore", buffering=BUFFER_SIZE) as csvfile:
+            # A known dialect skips the sniffer (which can guess wrong)
+            if dialect is not None:
+                dialect = DIALECTS.get(dialect, dialect)
+            else:
+                dialect = csv.Sniffer().sniff(csvfile.readline())
+                csvfile.seek(0)
+
+                # The sniffer only turns on doublequote if it sees "" in the first line
+                if dialect.escapechar is None:
+                    dialect.doublequote = True
+
+            # Rows are built the same way csv.DictReader builds them (blank lines are dropped and not counted)
+            records = enumerate(filter(None, csv.reader(csvfile, dialect=dialect)))
+
+            # Rows above the header row are still data (unless ignored), so they are held until the headers are known
+            above_header: list[tuple[int, list[str]]] = []
+            headers: list[str] = None
+            for i, record in records:
+                if i == header_line_num:
+                    headers = [sys.intern(header) for header in record]
+                    break
+
+                above_header.append((i, record))
+
+            if headers is None:
+                raise SystemExit(f"Could not find header row {header_line_num} in {file_name}")
+
+            num_headers: int = len(headers)
+            kept_headers: list[Header] = headers
+            get_kept_fields: Callable[[list[str]], tuple[str, ...]] = None
+            if columns is not None:
+                columns = set(columns)
+                missing_columns = columns.difference(headers)
+                if missing_columns:
+                    raise SystemExit(f"Could not find column(s) {', '.join(sorted(missing_columns))} in {file_name}")
+
+                kept_columns: list[tuple[int, Header]] = [(i, header) for i, header in enumerate(headers)
+                                                          if header in columns]
+                kept_headers = [header for _, header in kept_columns]
+                get_kept_fields = tuple_getter(*(i for i, _ in kept_columns))
+
+            debug: bool = DEBUG
+            for i, record in itertools.chain(above_header, records):
+                # ignored rows are dropped before a dictionary is built for them
+                if i in ignored_rows:
+                    if debug:
+                        print(f"Line #{i} (ignored): {record}")
+                    continue
 
-            reader = csv.DictReader(csvfile, fieldnames=headers, dialect=dialect)
+                if len(record) < num_headers:
+                    record.extend([None] * (num_headers - len(record)))
 
-            rows: list[Row] = []
-            for i, row in enumerate(reader):
-                if DEBUG:
+                if get_kept_fields is None:
+                    row: Row = dict(zip(headers, record))
+                    if len(record) > num_headers:
+                        row[None] = record[num_headers:]
+                else:
+                    row: Row = dict(zip(kept_headers, get_kept_fields(record)))
+
+                if debug:
                     print(f"Line #{i}: {row}")
-                if i in ignored_rows or i == header_line_num:
-                    continue
 
-                rows.append(row)
+                yield row
     except FileNotFoundError:
         raise SystemExit(f"Could not find {file_name}")
 
-    return rows
 
+def tuple_getter(*keys) -> Callable[[Sequence | Mapping], tuple]:
+    """
+    Makes a function that gets the items under the given keys (or indices) as a tuple. Same as operator.itemgetter
+    except that it always returns a tuple, even for a single key or no keys.
+
+    :param keys: Keys (or indices) of the items to get
+    :return: Function that takes a row/record and returns a tuple of its items under the keys
+    """
+    if not keys:
+        return lambda row: ()
+    if len(keys) == 1:
+        # itemgetter would return the bare item instead of a tuple
+        key = keys[0]
+        return lambda row: (row[key],)
+
+    return operator.itemgetter(*keys)
+
+
+def parse_sources(config: configparser.ConfigParser, cols_name_mapping: dict[str, dict[Header, Header]],
+                  parallel: bool = False) -> Iterator[Iterable[Row]]:
+    """
+    Parses the csv file of each source in the config file, yielding the parsed sources in the order they are listed in
+    the sources section. Only the columns in each source's names map are kept, and a source's file is read in the
+    dialect given in its section (or a guessed one if it doesn't have one). By default each source is yielded as a
+    generator of its rows (see iter_csv) so only one row of a source is in memory at a time. If parallel is true then
+    the files are parsed concurrently in up to 8 worker threads and each parsed source is yielded as a list as soon as
+    it (and the sources before it) are done, so the caller can transfer one source while the rest are still being
+    parsed.
+
+    :param config: Parsed config file
+    :param cols_name_mapping: Dictionary of each source name (keys) and their names map (values)
+    :param parallel: If true, parse all sources concurrently instead of one at a time
+    :return: Generator of each source's parsed rows
+    """
+    parse_args = [(config["sources"][source], config.getint(source, "header_row_num"),
+                   parse_ignored_rows(config[source]["ignored_rows"]), cols_name_mapping[source].keys(),
+                   config[source].get("dialect") or None)
+                  for source in config["sources"]]
 
-def transfer_data(source_name: str, source: list[Row], output: list[Row], names_map: dict[Header, Header],
+    if not parallel:
+        for args in parse_args:
+            yield iter_csv(*args)
+        return
+
+    # Parsing is mostly waiting on disk, so a handful of threads is enough to keep it busy. Capping them keeps configs
+    # with many sources from opening every file (each with its own read buffer) at once.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(8, len(parse_args)))) as executor:
+        futures = [executor.submit(parse_csv, *args) for args in parse_args]
+        for future in futures:
+            yield future.result()
+
+
+def transfer_data(source_name: str, source: Iterable[Row], output: list[Row], names_map: dict[Header, Header],
                   match_by: list[Header], unmatched_output: str = None, dialect: str = "excel",
-                  regex: dict[Header, str] = None, strict: bool = False) -> None:
+                  regex: dict[Header, str | re.Pattern] = None, strict: bool = False,
+                  match_index: dict[Header, dict[Data, list[Row]]] = None) -> None:
     """
     Moves data from columns in the source whose headers appear in names_map to the output under the corresponding header
     name that appear in the names_map. A match of the data transferred this way is attempted. The data is matched
@@ -405,139 +588,226 @@ def transfer_data(source_name: str, source: list[Row], output: list[Row], names_
     unmatched data will be written to that file.
 
     :param source_name: Name of the source which the source file represents
-    :param source: Parsed source file
+    :param source: Parsed source file (rows are only iterated over once, so this can be a generator)
     :param output: Destination of data from source files
     :param names_map: Column(s) whose data will be transferred and the names of the columns in the output to put them in
     :param match_by: Columns from source file to align data by
     :param unmatched_output: Name of file to output unmatched values to. If no name is provided, unmatched values will
     not be recorded
     :param dialect: Dialect to write unmatched output in (same dialect as regular output)
-    :param regex: Dictionary of fields/headers (keys) and the regex (values) to validate them by
+    :param regex: Dictionary of fields/headers (keys) and the regex (values, compiled or not) to validate them by
     :param strict: If true, sources after the first must match at least one field from match by to have data transferred
+    :param match_index: Index of the output as built by build_match_index. When the same dictionary is passed for every
+    source it is only extended (never rebuilt), otherwise it is built from the output for this call
     :return:
     """
 
-    first_source: bool = output == []
+    first_source: bool = not output
     buffer: list[Row] = []  # Buffering instead of appending to output directly to avoid matching data from same source
-    unmatched_data: list[Row] = []
-    for row in source:
-        data_to_transfer: Row = {}  # will contain only the data we want to transfer from the row
-        found_match: bool = False
-
-        # Extract data
-        data_to_transfer["Sources found in"] = source_name
-        data_to_transfer["Source rules broken"] = "Not checked"
-        for header in names_map:
-            data_to_transfer[names_map[header]] = row[header]
-
-        if regex is not None and not data_matches_regex(data_to_transfer, regex):
-            data = {"Sources found in": source_name, "Reason it didn't match": "Data didn't match regex/field_rule"}
-            for header in names_map:
-                data[header] = row[header]
-
-            unmatched_data.append(data)
-            continue
-
-        # attempt to find a match and transfer data if it would go into an empty field
-        for out_row in output:
-            if rows_match(row, out_row, match_by, names_map):
-                found_match = True
-
-                for header in data_to_transfer:
-                    if header == "Sources found in":  # append source name to output under "sources found in"
-                        if header not in out_row.keys():
-                            out_row[header] = data_to_transfer[header]
-                        elif source_name not in out_row[header].split(", "):  # avoid duplicates of source names
-                            out_row[header] += f", {data_to_transfer[header]}"
-
-                        continue
-
-                    # check if data is already there before moving data
-                    if header not in out_row.keys() or out_row[header] in ["", None]:
-                        out_row[header] = data_to_transfer[header]
-
-        if (not strict or first_source) and not found_match:
-            buffer.append(data_to_transfer)
-        elif unmatched_output not in [None, ""] and not found_match:
-            data = {"Sources found in": source_name, "Reason it didn't match": "Strict on and no match found"}
-            for header in names_map:
-                data[header] = row[header]
-
-            unmatched_data.append(data)
-
-    output.extend(buffer)
+    found_in_source: set[int] = set()  # ids of output rows already known to list this source under "Sources found in"
+    record_unmatched: bool = bool(unmatched_output)  # neither None nor empty
+
+    source_headers: list[Header] = list(names_map)
+    out_headers: list[Header] = list(names_map.values())
+    get_fields = tuple_getter(*source_headers)
+    # Position in the fields of the data for each output header (the last one wins if headers share an output name,
+    # same as when the fields are put in a dictionary)
+    out_positions: dict[Header, int] = {out_header: i for i, out_header in enumerate(out_headers)}
+
+    # (position in the fields, output header) of each match by field
+    match_by_pairs: tuple[tuple[int, Header], ...] = tuple((source_headers.index(header), names_map[header])
+                                                           for header in match_by if header in names_map)
+
+    if match_index is None:
+        match_index = {}
+    unindexed_headers: list[Header] = [header for header in match_by
+                                       if header in names_map and names_map[header] not in match_index]
+    match_index.update(build_match_index(output, names_map, unindexed_headers))
+
+    # Every new row starts as a copy of this
+    template: Row = dict.fromkeys(["Sources found in", "Source rules broken", *names_map.values()])
+    template["Sources found in"] = source_name
+    template["Source rules broken"] = "Not checked"
+
+    rows_fail_regex: bool = False
+    if regex is not None:
+        regex = compile_rules(regex)
+        # "Sources found in" and "Source rules broken" are the same for every row of this source
+        rows_fail_regex = any(pattern.search(template[header]) is None for header, pattern in regex.items()
+                              if header in template and header not in out_positions)
+        # rules for fields this source doesn't transfer are ignored
+        regex = [(out_positions[header], pattern) for header, pattern in regex.items() if header in out_positions]
+
+    def transfer_rows() -> Iterator[Row]:
+        """
+        Transfers the source's rows, yielding each row's unmatched data as it comes up so it can be written out as
+        the source is read instead of being held until the end.
+        """
+        for row in source:
+            # Extract data (it is only put into a dictionary of its own if it becomes a new row in the output)
+            fields: list[Data] = list(get_fields(row))
+
+            # Match by values are interned (the source row itself is left as is)
+            for i, _ in match_by_pairs:
+                if fields[i]:
+                    fields[i] = sys.intern(fields[i])
+
+            if rows_fail_regex or (regex and not data_matches_regex(fields, regex)):
+                data = {"Sources found in": source_name, "Reason it didn't match": "Data didn't match regex/field_rule"}
+                data.update(zip(source_headers, fields))
+
+                yield data
+                continue
 
-    if unmatched_output not in [None, ""]:
+            # attempt to find a match and transfer data if it would go into an empty field
+            # keyed by id so an output row matching on more than one field is only used once
+            matches: dict[int, Row] = {}
+            for i, out_header in match_by_pairs:
+                for out_row in match_index[out_header].get(fields[i], ()):
+                    matches[id(out_row)] = out_row
+
+            found_match = len(matches) > 0
+            for out_row in matches.values():
+                # append source name to output under "sources found in" (skip splitting the names again for rows matched
+                # repeatedly)
+                if id(out_row) not in found_in_source:
+                    found_in_source.add(id(out_row))
+
+                    sources_found_in: str = out_row.get("Sources found in")
+                    if sources_found_in is None:
+                        out_row["Sources found in"] = source_name
+                    elif source_name not in sources_found_in.split(", "):  # avoid duplicates of source names
+                        out_row["Sources found in"] = f"{sources_found_in}, {source_name}"
+
+                if not out_row.get("Source rules broken"):
+                    out_row["Source rules broken"] = "Not checked"
+
+                # fields go straight from the source row into the output row, only if the output row's field is empty
+                for out_header, i in out_positions.items():
+                    if not out_row.get(out_header):  # missing, None, or empty
+                        out_row[out_header] = fields[i]
+
+                        # a filled in match by field can be matched by the rest of this source's rows
+                        if out_header in match_index and fields[i]:
+                            match_index[out_header].setdefault(fields[i], []).append(out_row)
+
+            if (not strict or first_source) and not found_match:
+                data_to_transfer: Row = template.copy()  # will contain only the data we want to transfer from the row
+                data_to_transfer.update(zip(out_headers, fields))
+                buffer.append(data_to_transfer)
+            elif record_unmatched and not found_match:
+                data = {"Sources found in": source_name, "Reason it didn't match": "Strict on and no match found"}
+                data.update(zip(source_headers, fields))
+
+                yield data
+
+    # The unmatched file is only opened once there is unmatched data (otherwise the source gets a line saying so)
+    unmatched_rows: Iterator[Row] = transfer_rows()
+    first_unmatched: Row = next(unmatched_rows, None)
+    if record_unmatched:
         append = not first_source
 
-        if unmatched_data == []:
+        if first_unmatched is None:
             with open(unmatched_output, "a" if append else "w") as f:
                 f.write(f"{source_name} had no unmatched data :)\n")
         else:
             headers: list[str] = ["Sources found in", "Reason it didn't match"]
             headers.extend(names_map.keys())
-            write_csv(unmatched_output, headers, unmatched_data, dialect, append=append)
+            write_csv(unmatched_output, headers, itertools.chain([first_unmatched], unmatched_rows), dialect,
+                      append=append)
+
+    # Finish transferring the source if its unmatched data isn't being recorded (or the file wasn't overwritten)
+    for _ in unmatched_rows:
+        pass
+
+    output.extend(buffer)
+    add_to_match_index(match_index, buffer)  # only now so this source's rows weren't matched against each other
 
 
-def rows_match(row: Row, out_row: Row, match_by: list[Header],
-               names_map: dict[Header, Header]) -> bool:
+def build_match_index(output: list[Row], names_map: dict[Header, Header],
+                      match_by: list[Header]) -> dict[Header, dict[Data, list[Row]]]:
     """
-    Determines whether two rows match one another. Two rows are considered matching if the data under one or more
-    specified headers is identical. For the row parameter this means the headers in the match_by list. For the out_row
-    parameter this means the headers that are mapped (values) to the headers in the match_by (keys) in the names_map.
+    Builds a hash index over the output for each match by field so a source row can look up the output rows it matches
+    instead of comparing against every row in the output. For each header in match_by the index maps the header it is
+    mapped to in the output to a dictionary of data (keys) and the output rows containing that data under said header
+    (values). Empty data is left out of the index since it never counts as a match.
 
-    :param row: Row from source
-    :param out_row: Row in output
-    :param match_by: Headers to match data by
+    :param output: Rows in the output
     :param names_map: Mapping of headers in sources to headers in the output
-    :return: True if the rows match, false if not
+    :param match_by: Headers to match data by
+    :return: Dictionary of output headers (keys) and the index of the output rows by their data under that header
+    """
+    match_index: dict[Header, dict[Data, list[Row]]] = {names_map[match]: {} for match in match_by}
+    add_to_match_index(match_index, output)
+
+    return match_index
+
+
+def add_to_match_index(match_index: dict[Header, dict[Data, list[Row]]], rows: Iterable[Row]) -> None:
+    """
+    Adds rows to an index built by build_match_index under every header the index covers. Rows are added to the index
+    in place.
+
+    :param match_index: Index to add the rows to
+    :param rows: Rows to add to the index
+    :return:
     """
-    matches = False
+    for row in rows:
+        for out_header, index in match_index.items():
+            data = row.get(out_header)
+            if data:
+                index.setdefault(data, []).append(row)
 
-    for match in match_by:
-        out_match = names_map[match]
-        if out_match in out_row and row[match] != "" and out_row[out_match] == row[match]:
-            matches = True
-            break
 
-    return matches
+def compile_rules(rules: Mapping[Header, str | re.Pattern]) -> dict[Header, re.Pattern]:
+    """
+    Compiles the regex of each rule once so it doesn't have to be looked up in (or added to) re's pattern cache every
+    time it is applied to a row. Already compiled patterns are passed through as is.
+
+    :param rules: Dictionary of headers (keys) and associated regex (values)
+    :return: Dictionary of headers (keys) and associated compiled regex (values)
+    """
+    return {header: re.compile(pattern) for header, pattern in rules.items()}
 
 
-def data_matches_regex(data: Row, regex: dict[Header, str]) -> bool:
+def data_matches_regex(data: Row | Sequence[Data], regex: Iterable[tuple[Header | int, re.Pattern]]) -> bool:
     """
-    Checks if given row's data that is being transferred matches the given regex for specific fields/headers. If a regex
-    appears that refers to data not being transferred, it will be ignored.
+    Checks if given row's data that is being transferred matches the given regex for specific fields/headers. Regex
+    that refers to data not being transferred must be left out by the caller (transfer_data does this once per source).
+    The data can also be the row's fields by position, in which case the regex is paired with positions instead of
+    headers.
 
-    :param data: Dictionary of headers (keys) and associated data (values)
-    :param regex: Dictionary of headers (keys) and associated regex (values) for data to match
+    :param data: Dictionary of headers (keys) and associated data (values), or the data by position
+    :param regex: Pairs of headers (or positions) and associated compiled regex for data to match
     :return: True if all data matches given regex, false otherwise
     """
-    for header in regex:
-        if re.search(pattern=regex[header], string=data[header]) is None:
+    for header, pattern in regex:
+        if pattern.search(data[header]) is None:
             return False
 
     return True
 
 
-def parse_source_rules(config: configparser.ConfigParser) -> dict[str, configparser.SectionProxy]:
+def parse_source_rules(config: configparser.ConfigParser) -> dict[str, dict[Header, re.Pattern]]:
     """
     Creates a dictionary of source names with rules as values. The rules are dictionaries of headers (from the output)
-    and the regex to apply for that header.
+    and the compiled regex to apply for that header. The rules are copied out of the config into plain dictionaries
+    since they are looked up for every row in the output.
 
     :param config: Parsed config file
-    :return: Dictionary of each source name (keys) and their rules (values) which are dictionaries of headers and regexs
+    :return: Dictionary of each source name (keys) and their rules (values) which are dictionaries of headers and
+    compiled regexs
     """
     source_rules = {}
 
     for source in config["sources"]:
         if f"{source}_rules" in config:
-            rules = config[f"{source}_rules"]
-            source_rules[source] = rules
+            source_rules[source] = compile_rules(config[f"{source}_rules"])
 
     return source_rules
 
 
-def enforce_source_rules(data: list[Row], rules: dict[str, configparser.SectionProxy]) -> None:
+def enforce_source_rules(data: list[Row], rules: dict[str, dict[Header, str | re.Pattern]]) -> None:
     """
     Goes through the data checking if source rules are obeyed. All broken rules are documented in the "Source rules
     broken" column with the format "source_name:rule_broken" (quotes not included). If no source rules are broken then
@@ -548,23 +818,26 @@ def enforce_source_rules(data: list[Row], rules: dict[str, configparser.SectionP
     :param rules: Dictionary with the source names (keys) and the rules for each source (values)
     :return:
     """
+    rules = {source_name: compile_rules(source_rules) for source_name, source_rules in rules.items() if source_rules}
+
+    if not rules:  # nothing can be broken, so skip splitting every row's source names
+        for row in data:
+            row["Source rules broken"] = "None"
+        return
+
     for row in data:
-        rules_broken: str = ""
+        rules_broken: list[str] = []
+        sources_found_in: set[str] = set(row["Sources found in"].split(", "))
         for source_name in rules:
-            # if row doesn't contain data from source_name
-            if re.search(pattern=source_name, string=row["Sources found in"]) is None:
+            # if row doesn't contain data from source_name (exact names, "source1" shouldn't count as in "source10")
+            if source_name not in sources_found_in:
                 continue
 
-            for header in rules[source_name]:
-                regex = rules[source_name][header]
-
-                if re.search(pattern=regex, string=row[header]) is None:
-                    rules_broken += f"{source_name}:{header}" if rules_broken == "" else f", {source_name}:{header}"
+            for header, pattern in rules[source_name].items():
+                if pattern.search(row[header]) is None:
+                    rules_broken.append(f"{source_name}:{header}")
 
-        if rules_broken == "":
-            row["Source rules broken"] = "None"
-        else:
-            row["Source rules broken"] = rules_broken
+        row["Source rules broken"] = ", ".join(rules_broken) if rules_broken else "None"
 
 
 def unify_headers(names_map: dict[str, dict[Header, Header]]) -> list[str]:
@@ -574,17 +847,16 @@ def unify_headers(names_map: dict[str, dict[Header, Header]]) -> list[str]:
     :param names_map: Map of the headers from each source and their associated name in the output
     :return: A list of headers to be used in the output
     """
-    unified_headers: list[str] = ["Sources found in", "Source rules broken"]
+    # dict keys keep the order headers are first seen in (like the list did) with constant time duplicate checks
+    unified_headers: dict[str, None] = dict.fromkeys(["Sources found in", "Source rules broken"])
 
     for source in names_map:
-        for header in names_map[source].values():
-            if header not in unified_headers:
-                unified_headers.append(header)
+        unified_headers.update(dict.fromkeys(names_map[source].values()))
 
-    return unified_headers
+    return list(unified_headers)
 
 
-def write_csv(file_name: str, headers: list[str], data: list[Row], dialect: str, append: bool = False) -> None:
+def write_csv(file_name: str, headers: list[str], data: Iterable[Row], dialect: str, append: bool = False) -> None:
     """
     Writes data to a csv from a list of rows where each row is a dictionary containing keys which are the
     headers and values which are the elements of that row using the given dialect. If there is no file by the given
@@ -612,9 +884,10 @@ def write_csv(file_name: str, headers: list[str], data: list[Row], dialect: str,
             return
 
 
-def write_data(file_name: str, mode, headers: list[str], data: list[Row], dialect: str) -> None:
+def write_data(file_name: str, mode, headers: list[str], data: Iterable[Row], dialect: str) -> None:
     """
-    Writes data to a file by the given name using the given mode and dialect.
+    Writes data to a file by the given name using the given mode and dialect. Rows are streamed to the file one at a
+    time through a large write buffer, so data can be any iterable of rows (e.g. a generator).
 
     :param file_name: Name of file to be written to or created.
     :param mode: What mode to open the file in (w, r, a, etc.)
@@ -624,10 +897,11 @@ def write_data(file_name: str, mode, headers: list[str], data: list[Row], dialec
     :raises FileExistsError: If mode is "x" and there is already a file by the name file_name.
     :return:
     """
-    with open(file_name, mode, newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=headers, dialect=dialect)
-        writer.writeheader()
-        writer.writerows(data)
+    with open(file_name, mode, newline='', buffering=BUFFER_SIZE) as csvfile:
+        # A plain writer fed rows already in header order skips DictWriter's per row check for keys not in headers
+        writer = csv.writer(csvfile, dialect=DIALECTS.get(dialect, dialect))
+        writer.writerow(headers)
+        writer.writerows([row.get(header, "") for header in headers] for row in data)
 
 
 if __name__ == "__main__":
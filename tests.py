@@ -23,6 +23,11 @@ class MyTestCase(unittest.TestCase):
         self.assertFalse(main.valid_file_names(names1))
         self.assertFalse(main.valid_file_names(names2))
 
+    def test_parse_ignored_rows(self):
+        self.assertEqual(frozenset([0, 5]), main.parse_ignored_rows("0,5"))
+        self.assertEqual(frozenset([-1, 3]), main.parse_ignored_rows("-1, 3,"))
+        self.assertEqual(frozenset(), main.parse_ignored_rows(""))
+
     def test_parse_csv(self):
         parsed_csv: list[main.Row] = main.parse_csv("example_files/example.csv", 0, [])
         expected_parsed_csv: list[main.Row] = [
@@ -77,6 +82,73 @@ class MyTestCase(unittest.TestCase):
 
         self.assertEqual(expected_parsed_csv, parsed_csv)
 
+    def test_parse_csv_quoted_fields(self):
+        parsed_csv: list[main.Row] = main.parse_csv("example_files/example4.csv", 0, [])
+        expected_parsed_csv: list[main.Row] = [
+            {"id": "1", "last name, first name": "Smith, John", "address": "12 Main St, Apt 4",
+             "notes": "Says \"hi\", often"},
+            {"id": "2", "last name, first name": "Wayne, Emily", "address": "", "notes": "one, two, three"}
+        ]
+
+        self.assertEqual(expected_parsed_csv, parsed_csv)
+
+    def test_parse_csv_dialect(self):
+        self.assertEqual(main.parse_csv("example_files/example.csv", 0, []),
+                         main.parse_csv("example_files/example.csv", 0, [], dialect="excel"))
+        self.assertEqual(main.parse_csv("example_files/example4.csv", 0, [], columns=["notes"]),
+                         main.parse_csv("example_files/example4.csv", 0, [], columns=["notes"], dialect="excel"))
+
+    def test_dialect_names(self):
+        config = configparser.ConfigParser()
+        config.read("example_files/config_example.ini")
+        sample_data: list[main.Row] = [{"Name": "John Deer", "Occupation": "Landscaping, Farming"}]
+
+        for dialect in ["unix", "excel", "excel_tab"]:
+            config["source1"]["dialect"] = dialect
+            config["output"]["dialect"] = dialect
+            main.validate_config(config)
+
+            main.write_data("test_outputs/dialect_output.csv", "w", ["Name", "Occupation"], sample_data, dialect)
+            self.assertEqual(sample_data, main.parse_csv("test_outputs/dialect_output.csv", 0, [], dialect=dialect))
+
+        config["source1"]["dialect"] = "tab"
+        with self.assertRaises(SystemExit):
+            main.validate_config(config)
+
+    def test_parse_csv_columns(self):
+        parsed_csv: list[main.Row] = main.parse_csv("example_files/example3.csv", 1, [0, 6, 5],
+                                                    columns=["favorite color", "social security"])
+        expected_parsed_csv: list[main.Row] = [
+            {"social security": "", "favorite color": "Teal"},
+            {"social security": "1234321", "favorite color": "Red"},
+            {"social security": "234111", "favorite color": "Magenta"}
+        ]
+
+        self.assertEqual(expected_parsed_csv, parsed_csv)
+
+        with self.assertRaises(SystemExit):
+            main.parse_csv("example_files/example3.csv", 1, [0, 6, 5], columns=["does not exist"])
+
+    def test_tuple_getter(self):
+        row: main.Row = {"a": "1", "b": "2"}
+
+        self.assertEqual((), main.tuple_getter()(row))
+        self.assertEqual(("1",), main.tuple_getter("a")(row))
+        self.assertEqual(("2", "1"), main.tuple_getter("b", "a")(row))
+        self.assertEqual(("z",), main.tuple_getter(2)(["x", "y", "z"]))
+
+    def test_parse_sources_parallel(self):
+        main.CONFIG_FILE_NAME = "example_files/config_example2.ini"
+        config: configparser.ConfigParser = main.get_config_constants()
+        cols_name_mapping: dict = main.map_columns_names(config)
+
+        parsed_sources: list[list[main.Row]] = [list(rows) for rows in main.parse_sources(config, cols_name_mapping)]
+        parsed_sources_parallel: list[list[main.Row]] = list(main.parse_sources(config, cols_name_mapping,
+                                                                                parallel=True))
+
+        self.assertEqual(2, len(parsed_sources))
+        self.assertEqual(parsed_sources, parsed_sources_parallel)
+
     def test_get_constants_from_file(self):
         main.CONFIG_FILE_NAME = "example_files/config_example.ini"
         config: configparser.ConfigParser = main.get_config_constants()
@@ -143,6 +215,16 @@ class MyTestCase(unittest.TestCase):
         with self.assertRaises(SystemExit):
             main.get_config_constants()
 
+    def test_validate_rules_invalid_regex(self):
+        config = configparser.ConfigParser()
+        config.read_dict({"sources": {"source1": "example_files/example.csv"}, "field_rules": {"a": "^[0-9]+$"},
+                          "source1_rules": {"b": "^x"}})
+
+        main.validate_rules(config, ["a", "b"])
+        config["field_rules"]["a"] = "[0-9"
+        with self.assertRaises(SystemExit):
+            main.validate_rules(config, ["a", "b"])
+
     def test_write_to_csv(self):
         sample_data: list[main.Row] = [
             {"Name": "John Deer", "Occupation": "Landscaping"},
@@ -184,8 +266,8 @@ class MyTestCase(unittest.TestCase):
         ]
         source1_name = "source1"
         source2_name = "source2"
-        names_map1: dict[str: str] = {"t": "t", "func1": "func1", "func2": "func2"}
-        names_map2: dict[str: str] = {"x": "t", "x^2": "func1", "x^3": "func2"}
+        names_map1: dict[str, str] = {"t": "t", "func1": "func1", "func2": "func2"}
+        names_map2: dict[str, str] = {"x": "t", "x^2": "func1", "x^3": "func2"}
         match_by1: list[str] = []
         match_by2: list[str] = ["x"]
 
@@ -213,6 +295,60 @@ class MyTestCase(unittest.TestCase):
 
         self.assertEqual(expected_output, output)
 
+    def test_transfer_data_shared_match_index(self):
+        source1: list[main.Row] = [{"id": "1", "v": ""}]
+        source2: list[main.Row] = [{"id": "1", "v": "a"}, {"id": "2", "v": "b"}]
+        source3: list[main.Row] = [{"v": "a", "w": "x"}, {"v": "b", "w": "y"}, {"v": "c", "w": "z"}]
+        match_index: dict = {}
+
+        output = []
+
+        main.transfer_data("source1", source1, output, {"id": "id", "v": "v"}, [], match_index=match_index)
+        main.transfer_data("source2", source2, output, {"id": "id", "v": "v"}, ["id"], match_index=match_index)
+        main.transfer_data("source3", source3, output, {"v": "v", "w": "w"}, ["v"], match_index=match_index)
+
+        expected_output = [
+            {"Sources found in": "source1, source2, source3", "Source rules broken": "Not checked", "id": "1",
+             "v": "a", "w": "x"},
+            {"Sources found in": "source2, source3", "Source rules broken": "Not checked", "id": "2", "v": "b",
+             "w": "y"},
+            {"Sources found in": "source3", "Source rules broken": "Not checked", "v": "c", "w": "z"}
+        ]
+
+        self.assertEqual(expected_output, output)
+        self.assertEqual(main.build_match_index(output, {"id": "id", "v": "v"}, ["id", "v"]), match_index)
+
+    def test_transfer_data_regex_untransferred_field(self):
+        source1: list[main.Row] = [{"id": "1", "v": "a"}, {"id": "2", "v": "b"}]
+        source2: list[main.Row] = [{"id": "1", "w": "x"}, {"id": "3", "w": "y"}]
+        regex: dict[str, str] = {"v": "^a$", "w": "^x$"}
+
+        output = []
+
+        main.transfer_data("source1", source1, output, {"id": "id", "v": "v"}, [], regex=regex)
+        main.transfer_data("source2", source2, output, {"id": "id", "w": "w"}, ["id"], regex=regex)
+
+        expected_output = [
+            {"Sources found in": "source1, source2", "Source rules broken": "Not checked", "id": "1", "v": "a",
+             "w": "x"}
+        ]
+
+        self.assertEqual(expected_output, output)
+
+    def test_transfer_data_regex_bookkeeping_fields(self):
+        source: list[main.Row] = [{"id": "1"}, {"id": "2"}]
+
+        output = []
+        main.transfer_data("source1", source, output, {"id": "id"}, [], regex={"Sources found in": "^nomatch$"})
+        self.assertEqual([], output)
+
+        main.transfer_data("source1", source, output, {"id": "id"}, [],
+                           regex={"Sources found in": "^source1$", "Source rules broken": "^Not checked$"})
+        self.assertEqual([
+            {"Sources found in": "source1", "Source rules broken": "Not checked", "id": "1"},
+            {"Sources found in": "source1", "Source rules broken": "Not checked", "id": "2"}
+        ], output)
+
     def test_transfer_data2(self):
         source1: list[main.Row] = [
             {"Song": "Power Slam", "Rating": "8/10"},
@@ -229,8 +365,8 @@ class MyTestCase(unittest.TestCase):
         ]
         source1_name = "source1"
         source2_name = "source2"
-        names_map1: dict[str: str] = {"Song": "Song", "Rating": "Rating"}
-        names_map2: dict[str: str] = {"song": "Song", "rating": "Rating"}
+        names_map1: dict[str, str] = {"Song": "Song", "Rating": "Rating"}
+        names_map2: dict[str, str] = {"song": "Song", "rating": "Rating"}
         match_by1: list[str] = []
         match_by2: list[str] = ["song"]
 
@@ -326,9 +462,9 @@ class MyTestCase(unittest.TestCase):
         source1_name = "source1"
         source2_name = "source2"
         source3_name = "source3"
-        names_map1: dict[str: str] = {"File Name": "Name", "File Size": "Size", "Marked For Deletion": "Delete?"}
-        names_map2: dict[str: str] = {"Name": "Name", "Owner": "Owner", "Size": "Size", "Delete?": "Delete?"}
-        names_map3: dict[str: str] = {"name": "User", "admin privileges": "Admin?"}
+        names_map1: dict[str, str] = {"File Name": "Name", "File Size": "Size", "Marked For Deletion": "Delete?"}
+        names_map2: dict[str, str] = {"Name": "Name", "Owner": "Owner", "Size": "Size", "Delete?": "Delete?"}
+        names_map3: dict[str, str] = {"name": "User", "admin privileges": "Admin?"}
         match_by1: list[str] = []
         match_by2: list[str] = ["Name"]
         match_by3: list[str] = []
@@ -372,6 +508,25 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(expected_output, output)
         self.assertEqual(expected_unmatched_lines, unmatched_lines)
 
+    def test_enforce_source_rules(self):
+        data: list[main.Row] = [
+            {"Sources found in": "source1", "Source rules broken": "Not checked", "id": "1", "color": "red"},
+            {"Sources found in": "source10", "Source rules broken": "Not checked", "id": "2", "color": "red"},
+            {"Sources found in": "source10, source1", "Source rules broken": "Not checked", "id": "x", "color": "blue"},
+            {"Sources found in": "source.", "Source rules broken": "Not checked", "id": "y", "color": "blue"}
+        ]
+        rules: dict[str, dict[str, str]] = {
+            "source1": {"id": r"^\d+$", "color": "^blue$"},
+            "source.": {"color": "^red$"}
+        }
+
+        main.enforce_source_rules(data, rules)
+
+        self.assertEqual("source1:color", data[0]["Source rules broken"])
+        self.assertEqual("None", data[1]["Source rules broken"])
+        self.assertEqual("source1:id", data[2]["Source rules broken"])
+        self.assertEqual("source.:color", data[3]["Source rules broken"])
+
     def test_everything_together(self):
         main.CONFIG_FILE_NAME = "example_files/config_example.ini"
         config = main.get_config_constants()
@@ -505,7 +660,7 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(expected_unmatched_lines, unmatched_lines)
         self.assertConfigEquals(expected_constants, config)
 
-    def assertConfigEquals(self, expected_config: dict[str: dict[str: str]], config: configparser.ConfigParser):
+    def assertConfigEquals(self, expected_config: dict[str, dict[str, str]], config: configparser.ConfigParser):
         self.assertEqual(len(expected_config.keys()), len(config.sections()))
 
         for section in expected_config.keys():